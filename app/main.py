@@ -1,16 +1,19 @@
 import os
-import sys
 import logging
-from datetime import datetime
+import time
 import asyncio
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
-from twitchAPI.helper import first
 from twitchAPI.twitch import Twitch
 
-# Add plugins directory to Python path so we can import from kick.py
-sys.path.append("/app/plugins")
-from kick import get_kick_stream_info
+from plugins.kick import get_kick_stream_info
+
+try:
+    # Faster drop-in event loop; not available on Windows
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Configure logging with timestamps and log levels
 logging.basicConfig(
@@ -35,6 +38,17 @@ class StreamPlatform(ABC):
         """Check if a stream is live. Returns (is_live, stream_data)"""
         pass
 
+    async def get_live_streams(self, channels: List[str]) -> Dict[str, Any]:
+        """Check several channels at once. Returns {channel: stream_data} for live channels"""
+        results = await asyncio.gather(
+            *(self.is_stream_live(channel) for channel in channels)
+        )
+        return {
+            channel: stream_data
+            for channel, (is_live, stream_data) in zip(channels, results)
+            if is_live
+        }
+
     @abstractmethod
     def get_download_command(
         self, channel: str, stream_data: Any, output_file: str
@@ -63,6 +77,21 @@ class TwitchPlatform(StreamPlatform):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.twitch = None
+        # Streamlink options are the same for every channel, so build them once
+        self._streamlink_args = (
+            "streamlink",
+            "--twitch-api-header",
+            f'Authorization={self.config["oauth_token"]}',
+            "--stream-segment-threads",
+            "5",
+            "--twitch-disable-ads",
+            "--retry-max",
+            "10",
+            "--retry-streams",
+            "30",
+        )
+        # Twitch user IDs never change, so each login is only resolved once
+        self._user_id_cache: Dict[str, str] = {}
 
     async def setup_client(self):
         """Initialize the Twitch API client with authentication"""
@@ -76,34 +105,68 @@ class TwitchPlatform(StreamPlatform):
     async def is_stream_live(self, channel: str) -> tuple[bool, Optional[Any]]:
         """Check if a Twitch stream is live"""
         try:
-            # Get user ID from username
-            user = await first(self.twitch.get_users(logins=[channel]))
-            if not user:
-                logger.warning(f"⚠️ Could not find Twitch user: {channel}")
-                return False, None
-
-            stream = await first(self.twitch.get_streams(user_id=user.id))
-            return bool(stream), stream
+            live = await self.get_live_streams([channel])
+            return channel in live, live.get(channel)
 
         except Exception as e:
-            logger.error(f"❌ Error checking Twitch status for {channel}: {str(e)}")
+            logger.error("❌ Error checking Twitch status for %s: %s", channel, e)
             return False, None
 
+    async def get_live_streams(self, channels: List[str]) -> Dict[str, Any]:
+        """Check all Twitch channels with batched API calls instead of one per channel"""
+        # Resolve any user IDs we haven't seen yet, up to 100 logins per request
+        missing = [
+            channel for channel in channels if channel not in self._user_id_cache
+        ]
+        for i in range(0, len(missing), 100):
+            batch = missing[i : i + 100]
+            try:
+                await self._resolve_user_ids(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error("❌ Error looking up Twitch user %s: %s", batch[0], e)
+                    continue
+                # One malformed login fails the whole request, so look the
+                # rest up one at a time to keep the bad one from blocking them
+                for channel in batch:
+                    if channel in self._user_id_cache:
+                        continue
+                    try:
+                        await self._resolve_user_ids([channel])
+                    except Exception as e:
+                        logger.error(
+                            "❌ Error looking up Twitch user %s: %s", channel, e
+                        )
+
+        # Fetch live streams for every known user, up to 100 users per request
+        channels_by_id = {
+            self._user_id_cache[channel]: channel
+            for channel in channels
+            if channel in self._user_id_cache
+        }
+        user_ids = list(channels_by_id)
+        live_streams = {}
+        for i in range(0, len(user_ids), 100):
+            async for stream in self.twitch.get_streams(
+                user_id=user_ids[i : i + 100], first=100
+            ):
+                live_streams[channels_by_id[stream.user_id]] = stream
+        return live_streams
+
+    async def _resolve_user_ids(self, channels: List[str]):
+        """Look up and cache the user IDs of up to 100 Twitch logins in one request"""
+        pending = {channel.lower(): channel for channel in channels}
+        async for user in self.twitch.get_users(logins=list(pending)):
+            self._user_id_cache[pending.pop(user.login)] = user.id
+        for channel in pending.values():
+            logger.warning("⚠️ Could not find Twitch user: %s", channel)
+
     def get_download_command(
         self, channel: str, stream_data: Any, output_file: str
     ) -> List[str]:
         """Get streamlink command for Twitch"""
         return [
-            "streamlink",
-            "--twitch-api-header",
-            f'Authorization={self.config["oauth_token"]}',
-            "--stream-segment-threads",
-            "5",
-            "--twitch-disable-ads",
-            "--retry-max",
-            "10",
-            "--retry-streams",
-            "30",
+            *self._streamlink_args,
             "--output",
             output_file,
             f"https://twitch.tv/{channel}",
@@ -118,7 +181,6 @@ class TwitchPlatform(StreamPlatform):
 
     def get_stream_title(self, stream_data: Any) -> str:
         """Extract stream title from Twitch stream data"""
-        print(stream_data)
         if stream_data and hasattr(stream_data, "title"):
             return stream_data.title
         return "Live Stream"
@@ -129,6 +191,19 @@ class KickPlatform(StreamPlatform):
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
+        # Channel-independent streamlink options, built once
+        self._streamlink_args = (
+            "streamlink",
+            "--plugin-dirs",
+            "/app/plugins",  # Where we'll place the Kick plugin
+            "--retry-max",
+            "10",
+            "--retry-streams",
+            "30",
+        )
+        # Last response per channel, so unchanged responses can come back as
+        # 304 Not Modified
+        self._response_cache: Dict[str, dict] = {}
 
     async def setup_client(self):
         """Initialize the Kick API client"""
@@ -137,8 +212,14 @@ class KickPlatform(StreamPlatform):
     async def is_stream_live(self, channel: str) -> tuple[bool, Optional[Any]]:
         """Check if a Kick stream is live using our kick.py helper"""
         try:
-            # Use our helper function from kick.py to get stream info
-            stream_info = get_kick_stream_info(channel)
+            # Use our helper function from kick.py to get stream info. It is a
+            # blocking cloudscraper call, so run it in a worker thread to keep
+            # the event loop free for the other channel checks.
+            stream_info = await asyncio.to_thread(
+                get_kick_stream_info,
+                channel,
+                self._response_cache.setdefault(channel, {}),
+            )
 
             if stream_info and stream_info.get("is_live"):
                 return True, stream_info
@@ -146,7 +227,7 @@ class KickPlatform(StreamPlatform):
                 return False, None
 
         except Exception as e:
-            logger.error(f"❌ Error checking Kick status for {channel}: {str(e)}")
+            logger.error("❌ Error checking Kick status for %s: %s", channel, e)
             return False, None
 
     def get_download_command(
@@ -154,13 +235,7 @@ class KickPlatform(StreamPlatform):
     ) -> List[str]:
         """Get streamlink command for Kick using the plugin"""
         return [
-            "streamlink",
-            "--plugin-dirs",
-            "/app/plugins",  # Where we'll place the Kick plugin
-            "--retry-max",
-            "10",
-            "--retry-streams",
-            "30",
+            *self._streamlink_args,
             "--output",
             output_file,
             f"https://kick.com/{channel}",
@@ -180,18 +255,62 @@ class KickPlatform(StreamPlatform):
         return "Kick Live Stream"
 
 
+@dataclass(slots=True)
+class ChannelState:
+    """Download and polling state for a single monitored channel"""
+
+    platform: StreamPlatform
+    channel: str
+    # Running streamlink process, if the channel is being downloaded
+    process: Optional[asyncio.subprocess.Process] = None
+    # When the channel is next due for a liveness check (time.monotonic())
+    next_check: float = 0.0
+    # Current polling interval, grown while the channel stays offline
+    backoff: float = 0.0
+
+
 class StreamArchiver:
+    # Polling backs off by this factor for each check where a channel is
+    # still offline, up to MAX_CHECK_INTERVAL
+    _BACKOFF_FACTOR = 1.5
+
+    # Characters that can't appear in the output filename
+    _SANITIZE = str.maketrans({"/": "_", "\\": "_", "\0": "_"})
+
+    # Seconds a new download holds its start slot while streamlink and ffmpeg
+    # start up, unless it exits sooner
+    _STARTUP_WINDOW = 10
+
     def __init__(self):
         """Initialize the StreamArchiver with configuration from environment variables."""
         # Detect which platforms are configured
         self.platforms = self._initialize_platforms()
         self.check_interval = int(os.getenv("CHECK_INTERVAL", "30"))
+        # Backoff is opt-in: by default offline channels keep being checked
+        # every CHECK_INTERVAL
+        self.max_check_interval = int(
+            os.getenv("MAX_CHECK_INTERVAL", str(self.check_interval))
+        )
+        self.max_concurrent_starts = int(os.getenv("MAX_CONCURRENT_STARTS", "4"))
 
         # Set up paths
         self.output_dir = "/output"
 
-        # Dictionary to track active downloads
-        self.active_downloads = {}
+        # Download and polling state for every channel, built once as a flat
+        # list so each poll just walks it
+        self._channels: List[ChannelState] = [
+            ChannelState(platform, channel)
+            for platform, channels in self.platforms.values()
+            for channel in channels
+        ]
+
+        # Set when a download finishes so the main loop re-checks right away
+        self._wake = asyncio.Event()
+        self._background_tasks = set()
+
+        # Limits how many downloads can be starting up at once, e.g. when
+        # several channels are found live right after a restart
+        self._start_sem = asyncio.Semaphore(self.max_concurrent_starts)
 
         # Create necessary directories
         os.makedirs(self.output_dir, exist_ok=True)
@@ -207,11 +326,11 @@ class StreamArchiver:
         twitch_client_id = os.getenv("TWITCH_CLIENT_ID")
         twitch_client_secret = os.getenv("TWITCH_CLIENT_SECRET")
         twitch_oauth_token = os.getenv("TWITCH_OAUTH_TOKEN")
-        twitch_channels = (
-            os.getenv("TWITCH_CHANNELS", "").split(",")
-            if os.getenv("TWITCH_CHANNELS")
-            else []
-        )
+        twitch_channels = [
+            ch.strip()
+            for ch in os.getenv("TWITCH_CHANNELS", "").split(",")
+            if ch.strip()
+        ]
 
         if (
             twitch_client_id
@@ -226,22 +345,20 @@ class StreamArchiver:
             }
             platforms["twitch"] = (
                 TwitchPlatform(twitch_config),
-                [ch.strip() for ch in twitch_channels if ch.strip()],
+                twitch_channels,
             )
 
         # Check for Kick configuration
-        kick_channels = (
-            os.getenv("KICK_CHANNELS", "").split(",")
-            if os.getenv("KICK_CHANNELS")
-            else []
-        )
+        kick_channels = [
+            ch.strip() for ch in os.getenv("KICK_CHANNELS", "").split(",") if ch.strip()
+        ]
 
         if kick_channels:
             # Kick doesn't require authentication tokens for basic channel monitoring
             kick_config = {}
             platforms["kick"] = (
                 KickPlatform(kick_config),
-                [ch.strip() for ch in kick_channels if ch.strip()],
+                kick_channels,
             )
 
         return platforms
@@ -269,57 +386,119 @@ class StreamArchiver:
 
     async def check_stream_status(self):
         """Check if monitored channels are live and manage downloads accordingly."""
-        for platform_name, (platform, channels) in self.platforms.items():
-            for channel in channels:
-                channel_key = f"{platform_name}:{channel}"
-                try:
-                    is_live, stream_data = await platform.is_stream_live(channel)
-
-                    if is_live and channel_key not in self.active_downloads:
-                        # Stream is live and not being recorded
-                        title = platform.get_stream_title(stream_data)
-                        logger.info(
-                            f"🔴 Starting download for {platform.get_platform_name()} channel {channel} - {title}"
-                        )
-                        await self._start_download(
-                            platform_name, platform, channel, stream_data
-                        )
-
-                    elif not is_live and channel_key in self.active_downloads:
-                        # Stream ended
-                        logger.info(
-                            f"⏹️ Stream ended for {platform.get_platform_name()} channel {channel} - stopping download"
-                        )
-                        self._stop_download(channel_key)
+        # Only check channels whose next scheduled check has come up. Channels
+        # being downloaded are skipped entirely: streamlink handles reconnects
+        # and we hear about the stream ending when its process exits.
+        now = time.monotonic()
+        due: Dict[StreamPlatform, List[ChannelState]] = {}
+        for state in self._channels:
+            if state.process is None and state.next_check <= now:
+                due.setdefault(state.platform, []).append(state)
+
+        # Query every platform concurrently; each platform checks all of its
+        # channels at once (batched API calls where the platform supports it)
+        results = await asyncio.gather(
+            *(
+                platform.get_live_streams([state.channel for state in states])
+                for platform, states in due.items()
+            ),
+            return_exceptions=True,
+        )
 
-                except Exception as e:
-                    logger.error(
-                        f"❌ Error checking status for {platform.get_platform_name()} channel {channel}: {str(e)}"
+        live_states = []
+        starts = []
+        for (platform, states), live_streams in zip(due.items(), results):
+            if isinstance(live_streams, Exception):
+                logger.error(
+                    "❌ Error checking status for %s channels: %s",
+                    platform.get_platform_name(),
+                    live_streams,
+                )
+                # Retry at the base interval without touching the backoff
+                for state in states:
+                    state.next_check = time.monotonic() + self.check_interval
+                continue
+
+            for state in states:
+                is_live = state.channel in live_streams
+                self._schedule_next_check(state, back_off=not is_live)
+                if is_live:
+                    live_states.append(state)
+                    starts.append(
+                        self._handle_live_stream(state, live_streams[state.channel])
                     )
 
-    async def _start_download(
-        self,
-        platform_name: str,
-        platform: StreamPlatform,
-        channel: str,
-        stream_data: Any,
-    ):
+        # Start downloads concurrently; a failure comes back as a result
+        # instead of cancelling the other starts
+        start_results = await asyncio.gather(*starts, return_exceptions=True)
+        for state, result in zip(live_states, start_results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "❌ Error updating status for %s channel %s: %s",
+                    state.platform.get_platform_name(),
+                    state.channel,
+                    result,
+                )
+
+    def _schedule_next_check(self, state: ChannelState, back_off: bool):
+        """
+        Schedule a channel's next check with adaptive backoff.
+
+        Channels are checked every CHECK_INTERVAL after going offline, then
+        less often the longer they stay offline.
+        """
+        if back_off:
+            state.backoff = max(
+                self.check_interval,
+                min(state.backoff * self._BACKOFF_FACTOR, self.max_check_interval),
+            )
+        else:
+            state.backoff = self.check_interval
+        state.next_check = time.monotonic() + state.backoff
+
+    def _time_until_next_check(self) -> float:
+        """Seconds until the earliest scheduled check of a channel not being downloaded."""
+        next_checks = [
+            state.next_check for state in self._channels if state.process is None
+        ]
+        if not next_checks:
+            return self.check_interval
+        return max(0.0, min(next_checks) - time.monotonic())
+
+    async def _wait_for_next_check(self):
+        """Sleep until the next scheduled check or until a download finishes."""
+        try:
+            await asyncio.wait_for(
+                self._wake.wait(), timeout=self._time_until_next_check()
+            )
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _handle_live_stream(self, state: ChannelState, stream_data: Any):
+        """Start downloading a live stream that isn't being recorded yet."""
+        platform = state.platform
+        title = platform.get_stream_title(stream_data)
+        logger.info(
+            "🔴 Starting download for %s channel %s - %s",
+            platform.get_platform_name(),
+            state.channel,
+            title,
+        )
+        await self._start_download(state, stream_data)
+
+    async def _start_download(self, state: ChannelState, stream_data: Any):
         """
         Start downloading a stream using streamlink.
 
         Args:
-            platform_name (str): The platform name (twitch/kick)
-            platform (StreamPlatform): The platform implementation
-            channel (str): The channel name
+            state (ChannelState): The channel to download
             stream_data: Stream object from platform API
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+        platform, channel = state.platform, state.channel
+        timestamp = time.strftime("%Y-%m-%d %H:%M")
         title = platform.get_stream_title(stream_data)
-        safe_title = (
-            title.replace("/", "_").replace("\\", "_")[:200]
-            if title
-            else "Unknown Title"
-        )
+        safe_title = title.translate(self._SANITIZE)[:200] if title else "Unknown Title"
         filename = f"{timestamp} {platform.get_platform_shortname()} {channel} {safe_title}.mp4"
         output_file = os.path.join(self.output_dir, filename)
 
@@ -328,28 +507,59 @@ class StreamArchiver:
             channel, stream_data, output_file
         )
 
-        channel_key = f"{platform_name}:{channel}"
+        # Wait for a start slot; it is released by _release_start_slot once
+        # this download has been running for the startup window
+        await self._start_sem.acquire()
         try:
             # Start streamlink process
-            self.active_downloads[channel_key] = await asyncio.create_subprocess_exec(
-                *streamlink_command
-            )
-
+            process = await asyncio.create_subprocess_exec(*streamlink_command)
         except Exception as e:
+            self._start_sem.release()
             logger.error(
-                f"❌ Failed to start download for {platform.get_platform_name()} channel {channel}: {str(e)}"
+                "❌ Failed to start download for %s channel %s: %s",
+                platform.get_platform_name(),
+                channel,
+                e,
             )
-            self._stop_download(channel_key)
+            return
+        state.process = process
+
+        # Notice as soon as streamlink exits instead of waiting for a poll
+        watch_task = self._run_in_background(self._watch_process(state, process))
+        self._run_in_background(self._release_start_slot(watch_task))
+
+    def _run_in_background(self, coro) -> asyncio.Task:
+        """Start a task and keep a reference to it until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _release_start_slot(self, watch_task: asyncio.Task):
+        """Release a start slot once its download has warmed up or exited."""
+        await asyncio.wait({watch_task}, timeout=self._STARTUP_WINDOW)
+        self._start_sem.release()
+
+    async def _watch_process(
+        self, state: ChannelState, process: asyncio.subprocess.Process
+    ):
+        """Wait for a download to finish, then clean it up and wake the main loop."""
+        await process.wait()
 
-    def _stop_download(self, channel_key: str):
-        """Stop and cleanup active downloads."""
-        if channel_key in self.active_downloads:
-            try:
-                self.active_downloads[channel_key].terminate()
-            except (ProcessLookupError, OSError):
-                # Process already terminated or doesn't exist
-                pass
-            del self.active_downloads[channel_key]
+        logger.info(
+            "⏹️ Stream ended for %s channel %s - download finished",
+            state.platform.get_platform_name(),
+            state.channel,
+        )
+        state.process = None
+
+        # Check the channel again after one interval in case it is still live.
+        # Not right away: platforms keep reporting a stream as live for a while
+        # after it ends, and a fast-failing streamlink would be respawned
+        # in a tight loop. Wake the loop so it recomputes its sleep.
+        state.backoff = 0.0
+        state.next_check = time.monotonic() + self.check_interval
+        self._wake.set()
 
     async def run(self):
         """Main execution loop."""
@@ -363,19 +573,22 @@ class StreamArchiver:
             )
 
         logger.info(
-            f"🚀 Starting Stream Archiver - monitoring {' | '.join(platform_info)}"
+            "🚀 Starting Stream Archiver - monitoring %s", " | ".join(platform_info)
         )
 
         while True:
             try:
                 await self.check_stream_status()
-                await asyncio.sleep(self.check_interval)
+                await self._wait_for_next_check()
             except Exception as e:
-                logger.error(f"❌ Error in main loop: {str(e)}")
+                logger.error("❌ Error in main loop: %s", e)
                 # Wait a bit before retrying after an error
                 await asyncio.sleep(5)
 
 
 if __name__ == "__main__":
     archiver = StreamArchiver()
-    asyncio.run(archiver.run())
+    if uvloop is not None:
+        uvloop.run(archiver.run())
+    else:
+        asyncio.run(archiver.run())
@@ -4,10 +4,31 @@ Based on the community plugin from https://github.com/nonvegan/streamlink-plugin
 """
 
 import re
+import threading
+from typing import Optional
+
 from streamlink.plugin import Plugin, pluginmatcher, PluginError
 from streamlink.stream import HLSStream
 
 import cloudscraper
+import orjson
+
+# One scraper per thread, reused across calls so requests keep their
+# keep-alive connections and Cloudflare cookies instead of paying a fresh TLS
+# handshake each time. Sessions and cloudscraper's challenge state aren't
+# thread-safe, so threads must not share one.
+_local = threading.local()
+
+_VOD_RE = re.compile(r"/video/([^/?&]+)")
+_CLIP_RE = re.compile(r"clip=([^/?&]+)")
+
+
+def _get_scraper():
+    """Return the calling thread's scraper, creating it on first use"""
+    scraper = getattr(_local, "scraper", None)
+    if scraper is None:
+        scraper = _local.scraper = cloudscraper.create_scraper()
+    return scraper
 
 
 @pluginmatcher(re.compile(r"https?://(?:www\.)?kick\.com/(?P<channel>[^/?&]+)"))
@@ -18,14 +39,14 @@ class KickPlugin(Plugin):
 
     def __init__(self, a, url, options=None):
         super().__init__(a, url, options or {})
-        self.cloudscraper = cloudscraper.create_scraper()
+        self.cloudscraper = _get_scraper()
 
     def _get_streams(self):
         channel = self.match.group("channel")
 
         # Check if it's a VOD or clip URL
-        vod_match = re.search(r"/video/([^/?&]+)", self.url)
-        clip_match = re.search(r"clip=([^/?&]+)", self.url)
+        vod_match = _VOD_RE.search(self.url)
+        clip_match = _CLIP_RE.search(self.url)
 
         if vod_match:
             return self._get_vod_streams(vod_match.group(1))
@@ -36,106 +57,111 @@ class KickPlugin(Plugin):
 
     def _get_live_streams(self, channel):
         """Get live stream data"""
-        try:
-            response = self.cloudscraper.get(self._API_URL.format(channel=channel))
-            response.raise_for_status()
-            data = response.json()
-
-            if not data or not data.get("data"):
-                self.logger.error(f"No stream data found for channel: {channel}")
-                return {}
-
-            stream_data = data["data"]
-            playback_url = stream_data.get("playback_url")
-
-            if not playback_url:
-                self.logger.error(f"No playback URL found for channel: {channel}")
-                return {}
-
-            return HLSStream.parse_variant_playlist(self.session, playback_url)
-
-        except Exception as e:
-            self.logger.error(f"Error fetching live stream for {channel}: {str(e)}")
-            raise PluginError(f"Failed to get live stream data: {str(e)}")
+        return self._fetch_playlist(
+            self._API_URL.format(channel=channel),
+            "data",
+            "playback_url",
+            f"live stream for channel {channel}",
+        )
 
     def _get_vod_streams(self, video_id):
         """Get VOD stream data"""
-        try:
-            response = self.cloudscraper.get(self._VOD_URL.format(video_id=video_id))
-            response.raise_for_status()
-            data = response.json()
-
-            if not data or not data.get("data"):
-                self.logger.error(f"No VOD data found for video: {video_id}")
-                return {}
-
-            vod_data = data["data"]
-            playback_url = vod_data.get("source")
-
-            if not playback_url:
-                self.logger.error(f"No playback URL found for VOD: {video_id}")
-                return {}
-
-            return HLSStream.parse_variant_playlist(self.session, playback_url)
-
-        except Exception as e:
-            self.logger.error(f"Error fetching VOD for {video_id}: {str(e)}")
-            raise PluginError(f"Failed to get VOD data: {str(e)}")
+        return self._fetch_playlist(
+            self._VOD_URL.format(video_id=video_id),
+            "data",
+            "source",
+            f"VOD {video_id}",
+        )
 
     def _get_clip_streams(self, clip_id):
         """Get clip stream data"""
+        return self._fetch_playlist(
+            self._CLIP_URL.format(clip_id=clip_id),
+            "clip",
+            "video_url",
+            f"clip {clip_id}",
+        )
+
+    def _fetch_playlist(self, api_url, data_key, url_key, what):
+        """
+        Fetch an API response and return the HLS streams of its playback URL.
+
+        data_key is the response field holding the stream object, url_key the
+        field in it holding the playlist URL, and what describes the stream
+        for log and error messages.
+        """
         try:
-            response = self.cloudscraper.get(self._CLIP_URL.format(clip_id=clip_id))
+            response = self.cloudscraper.get(api_url)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
-            if not data or not data.get("clip"):
-                self.logger.error(f"No clip data found for clip: {clip_id}")
+            if not data or not data.get(data_key):
+                self.logger.error("No data found for %s", what)
                 return {}
 
-            clip_data = data["clip"]
-            playback_url = clip_data.get("video_url")
+            playback_url = data[data_key].get(url_key)
 
             if not playback_url:
-                self.logger.error(f"No playback URL found for clip: {clip_id}")
+                self.logger.error("No playback URL found for %s", what)
                 return {}
 
             return HLSStream.parse_variant_playlist(self.session, playback_url)
 
         except Exception as e:
-            self.logger.error(f"Error fetching clip for {clip_id}: {str(e)}")
-            raise PluginError(f"Failed to get clip data: {str(e)}")
+            self.logger.error("Error fetching %s: %s", what, e)
+            raise PluginError(f"Failed to get {what}: {str(e)}")
 
 
-def get_kick_stream_info(channel: str) -> dict:
+def get_kick_stream_info(channel: str, cache: Optional[dict] = None) -> dict:
     """
     Helper function to get Kick stream information for a channel.
     Returns dict with 'is_live', 'title', etc. or empty dict if error.
+
+    If a cache dict is passed, it keeps the ETag/Last-Modified validators and
+    result of the previous call for the same channel. The request is then
+    made conditional, and a 304 Not Modified response returns the cached
+    result without decoding anything.
     """
     try:
-        scraper = cloudscraper.create_scraper()
-        response = scraper.get(f"https://kick.com/api/v2/channels/{channel}/livestream")
+        headers = {}
+        if cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+
+        response = _get_scraper().get(
+            f"https://kick.com/api/v2/channels/{channel}/livestream", headers=headers
+        )
+        if response.status_code == 304 and cache and "result" in cache:
+            return cache["result"]
+
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if not data or not data.get("data"):
-            return {}
-
-        stream_data = data["data"]
-        playback_url = stream_data.get("playback_url")
-
-        # Extract stream info
-        result = {
-            "is_live": bool(playback_url),
-            "channel": channel,
-        }
-
-        if playback_url:
-            # Stream is live, get additional metadata
-            result["session_title"] = stream_data.get(
-                "session_title", f"Kick Stream - {channel}"
-            )
-            result["playback_url"] = playback_url
+            result = {}
+        else:
+            stream_data = data["data"]
+            playback_url = stream_data.get("playback_url")
+
+            # Extract stream info
+            result = {
+                "is_live": bool(playback_url),
+                "channel": channel,
+            }
+
+            if playback_url:
+                # Stream is live, get additional metadata
+                result["session_title"] = stream_data.get(
+                    "session_title", f"Kick Stream - {channel}"
+                )
+                result["playback_url"] = playback_url
+
+        if cache is not None:
+            cache["etag"] = response.headers.get("ETag")
+            cache["last_modified"] = response.headers.get("Last-Modified")
+            cache["result"] = result
 
         return result
 